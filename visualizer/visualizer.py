@@ -3,24 +3,136 @@ import networkx as nx
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import json
+import operator
+from collections import deque, Counter
 import tkinter as tk
 from tkinter import messagebox, ttk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import matplotlib
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.transforms import IdentityTransform
 import sys
+import threading
+import queue
+import bisect
+import os
+import hashlib
+import pickle
+import numpy as np
+try:
+    import pygraphviz as pgv # Optional: native Graphviz bindings, faster than the pydot round-trip
+except ImportError:
+    pgv = None
+try:
+    import pydot # .dot parser when pygraphviz is missing; one of the two is required
+except ImportError:
+    pydot = None
+try:
+    from numba import njit, prange # Optional: compiled, multi-threaded layout iterations
+except ImportError:
+    njit = None
+    prange = range
+try:
+    import igraph # Optional: C implementations of the force-directed layouts
+except ImportError:
+    igraph = None
+try:
+    import orjson # Optional: faster JSON parsing of --inputs
+except ImportError:
+    orjson = None
 matplotlib.use('TkAgg')
 
 # Global memory for Load/Store operations
 memory = {}
 
+# Marker area of a node that has not executed yet; also used to clip edge arrows
+NODE_SIZE = 1100
+
+# Fill color and marker area of each node display state, indexed by state code
+NODE_STATE_STYLES = [
+    ('orange', 800),              # STATE_LAST_STEP: executed in the last step
+    ('lightgreen', 1200),         # STATE_EXECUTED: executed in an earlier step
+    ('gold', 1200),               # STATE_COMPLETED: executed, and the simulation has completed
+    ('salmon', NODE_SIZE),        # Not executed yet: Stream
+    ('lightblue', NODE_SIZE),     # Not executed yet: FunctionInput
+    ('lightsteelblue', NODE_SIZE),# Not executed yet: Constant
+    ('wheat', NODE_SIZE),         # Not executed yet: Return
+    ('lightgray', NODE_SIZE),     # Not executed yet: any other op
+]
+STATE_LAST_STEP, STATE_EXECUTED, STATE_COMPLETED = 0, 1, 2
+IDLE_STATE_OF_OP = {'Stream': 3, 'FunctionInput': 4, 'Constant': 5, 'Return': 6}
+IDLE_STATE_OTHER = 7
+NODE_PALETTE = to_rgba_array([color for color, _ in NODE_STATE_STYLES])
+NODE_STATE_SIZES = np.array([size for _, size in NODE_STATE_STYLES], dtype=np.float64)
+
+# Formatter of a node's value in its label, by exact value type
+LABEL_VALUE_FORMAT = {float: '{:.2f}'.format, int: int.__repr__, bool: bool.__repr__, str: str}
+
+# Spring layouts of graphs with more nodes than this use numba ForceAtlas2 or NumPy FR without igraph
+LARGE_GRAPH_NODES = 500
+
+# Delay after the last keystroke in a function input before the simulation is reset
+RESET_DEBOUNCE_MS = 150
+STEP_POLL_MS = 16 # How often Tk checks for the result of a step running on the worker thread
+AUTO_STEP_MS = 200 # Interval between steps while the simulation runs on its own
+LOG_MAX_LINES = 5000 # Oldest log lines are trimmed beyond this, a long Text widget redraws slowly
+
+# Pickled graphs and layouts from earlier runs
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'riptide_viz')
+
+# Binary operators that are safe to apply directly when both operands are numbers
+NUMERIC_BINOPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '>': operator.gt,
+    '<': operator.lt,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+# Metadata for node labels that map directly onto an operation
+_LABEL_META = {
+    'st': {'op': 'Store'},
+    'ld': {'op': 'Load'},
+    '+': {'op': 'BasicBinaryOp', 'op_symbol': '+'},
+    'C': {'op': 'Carry'},
+    '>': {'op': 'BasicBinaryOp', 'op_symbol': '>'},
+    '==': {'op': 'BasicBinaryOp', 'op_symbol': '=='},
+    'M': {'op': 'Merge'},
+    'STR': {'op': 'Stream'},
+    'T': {'op': 'TS'}, # True Steer
+    'F': {'op': 'FS'}, # False Steer
+}
+
+# First label line of each op; FunctionInput and BasicBinaryOp are labelled per node
+_BASE_LABEL = {
+    'Constant': 'Const',
+    'Stream': 'STR',
+    'Return': 'ret',
+    'TS': 'TS',
+    'FS': 'FS',
+    'Load': 'ld',
+    'Store': 'st',
+    'Merge': 'M',
+    'Carry': 'C',
+}
+
+# Labels infer_op_metadata() could not map to an op, reported once per read_graph()
+UNKNOWN_LABELS = Counter()
+
 # Parse .dot labels into operation metadata
 def infer_op_metadata(data):
     raw_label = data.get('label', '')
     shape = data.get('shape', '')
-    lbl = raw_label.strip('"').split('\\n')[0]
+    label = raw_label.strip('"')
+    lbl = label.split('\\n')[0]
+    meta = _LABEL_META.get(lbl)
+    if meta is not None:
+        return dict(meta)
     meta = {}
     if lbl.startswith('Const'):
-        parts = raw_label.strip('"').split()
+        parts = label.split()
         try:
             val = int(parts[-1])
         except ValueError:
@@ -30,72 +142,96 @@ def infer_op_metadata(data):
                 val = 0
         meta['op'] = 'Constant'
         meta['value'] = val
-    elif lbl in ('st', 'ld'):
-        meta['op'] = 'Store' if lbl == 'st' else 'Load'
     elif '%' in lbl:
         meta['op'] = 'FunctionInput'
         meta['arg_value'] = 0  # Default, overridden by user input
         meta['param_name'] = lbl
-    elif lbl == '+':
-        meta['op'] = 'BasicBinaryOp'
-        meta['op_symbol'] = '+'
-    elif lbl == 'C':
-        meta['op'] = 'Carry'
-    elif lbl == '>':
-        meta['op'] = 'BasicBinaryOp'
-        meta['op_symbol'] = '>'
-    elif lbl == '==':
-        meta['op'] = 'BasicBinaryOp'
-        meta['op_symbol'] = '=='
-    elif lbl == 'M':
-        meta['op'] = 'Merge'
-    elif lbl == "STR":
-        meta['op'] = 'Stream'
-    elif lbl == "T":
-        meta['op'] = 'TS' # True Steer
-    elif lbl == "F":
-        meta['op'] = 'FS' # False Steer
     else:
-        print("Unknown: ", lbl, shape)
+        UNKNOWN_LABELS[(lbl, shape.strip('"'))] += 1
         meta['op'] = 'Unknown'
     return meta
 
 # Token-based execution system
+# Tokens in flight are kept as bare values; a Token is only built for the
+# execution log of the node that produced it.
 class Token:
+    __slots__ = ('value', 'source_node')
+
     def __init__(self, value, source_node=None):
         self.value = value
         self.source_node = source_node
     
     def __repr__(self):
         return f"Token({self.value})"
-    
-    def __eq__(self, other):
-        return ((self.value == other.value) and (self.source_node == other.source_node))
 
+# The executor only reads G, so it can share the GUI's graph; input_values overrides the
+# arg_value of FunctionInput nodes without having to copy the graph per run.
 class TokenBasedExecutor:
-    def __init__(self, G):
+    def __init__(self, G, input_values=None):
         self.G = G
         self.node_values = {}  # Current computed values for each node (output of the node)
-        self.pending_tokens = {}  # Map of Tokens waiting to be consumed by each node's inputs where nodes are keys and arrays of tokens are values
+        self.pending_tokens = {}  # Token values waiting to be consumed by each node's inputs where nodes are keys and deques of values are values
+        self.pending_sources = {}  # Source node of each pending value, kept parallel to pending_tokens
         self.execution_sequence = []  # Record of execution steps (list of step_info dicts)
         self.completed = False
         self.return_value = None
+
+        # Node attributes denormalized out of the networkx graph for the hot path
+        self.op = {}  # Operation type of each node
+        self.op_symbol = {}  # Operator symbol, only for nodes that carry one
+        self.const_value = {}  # Value emitted by Constant nodes
+        self.arg_value = {}  # Value emitted by FunctionInput nodes
+        self.numeric_only = set()  # BasicBinaryOps whose operands are provably numeric
+        self.index = {}  # Position of each node in G.nodes(), the order nodes fire within a step
+        self.arity = {}  # Number of pending tokens each node needs before it can fire
+        self.successors = {}  # Tuple of successors of each node
+        self.ready = set()  # Nodes that can fire in the next step
+        self._handlers = {  # Handler of each op type; anything else is a no-op
+            'Constant': self._exec_constant,
+            'FunctionInput': self._exec_function_input,
+            'Carry': self._exec_carry,
+            'BasicBinaryOp': self._exec_binop,
+            'Load': self._exec_load,
+            'Store': self._exec_store,
+            'TS': self._exec_ts,
+            'FS': self._exec_fs,
+            'Merge': self._exec_merge,
+        }
         
+        for i, (node, data) in enumerate(G.nodes(data=True)):
+            self.pending_tokens[node] = deque()
+            self.pending_sources[node] = deque()
+            self.op[node] = data.get('op', 'Unknown')
+            if 'op_symbol' in data:
+                self.op_symbol[node] = data['op_symbol']
+            self.const_value[node] = data.get('value', 0)
+            self.arg_value[node] = data.get('arg_value', 0)
+            if data.get('numeric_only'):
+                self.numeric_only.add(node)
+            self.index[node] = i
+            self.successors[node] = tuple(G.successors(node))
+        for node, value in (input_values or {}).items():
+            if self.op.get(node) == 'FunctionInput':
+                self.arg_value[node] = value
         for node in G.nodes():
-            self.pending_tokens[node] = []
+            self.arity[node] = self.get_op_arity(node)
+            if self.arity[node] == 0: # Sources fire every step
+                self.ready.add(node)
     
     def reset(self):
         global memory
         memory.clear()
         self.node_values = {}
-        self.pending_tokens = {node: [] for node in self.G.nodes()}
+        self.pending_tokens = {node: deque() for node in self.G.nodes()}
+        self.pending_sources = {node: deque() for node in self.G.nodes()}
+        self.ready = {node for node in self.G.nodes() if self.arity[node] == 0}
         self.execution_sequence = []
         self.completed = False
         self.return_value = None
 
     def get_op_arity(self, node_id):
         """Gets the min number of input tokens an operation consumes."""
-        op_type = self.G.nodes[node_id].get('op', 'Unknown')
+        op_type = self.op[node_id]
         if op_type in ['Constant', 'FunctionInput', 'Stream']:
             return 0
         elif op_type == 'Load':
@@ -107,150 +243,153 @@ class TokenBasedExecutor:
         elif op_type in ['Merge', 'Store']:
             return 3
         else: 
-            return len(list(self.G.predecessors(node_id)))
+            return self.G.in_degree(node_id)
 
-    def add_token(self, node, token):
+    def add_token(self, node, value, source_node=None):
         if node in self.pending_tokens:
-            if (token not in self.pending_tokens[node]): # Ensure no duplicate tokens
-                self.pending_tokens[node].append(token)
+            values = self.pending_tokens[node]
+            sources = self.pending_sources[node]
+            for pending_value, pending_source in zip(values, sources): # Ensure no duplicate tokens
+                if pending_value == value and pending_source == source_node:
+                    return
+            values.append(value)
+            sources.append(source_node)
+            if len(values) >= self.arity[node]:
+                self.ready.add(node)
     
     def can_execute(self, node):
-        op_type = self.G.nodes[node].get('op', 'Unknown')
-        
-        if op_type in ['Constant', 'FunctionInput', 'Stream']:
-            return True 
-
-        required_inputs = self.get_op_arity(node)
-        available_tokens = len(self.pending_tokens[node])
-        
-        return available_tokens >= required_inputs
+        return node in self.ready
     
-    def execute_node(self, node):
-        op_type = self.G.nodes[node].get('op', 'Unknown')
-        op_symbol_for_log = self.G.nodes[node].get('op_symbol', op_type)
+    def eval_binop(self, op_symbol, a_val, b_val):
+        """Evaluates a binary op on operands of any type (numbers, bools or strings)."""
+        if isinstance(a_val, bool): a_val = int(a_val)
+        if isinstance(b_val, bool): b_val = int(b_val)
+
+        if op_symbol == '+':
+            if isinstance(a_val, (int, float)) and isinstance(b_val, (int, float)):
+                result = a_val + b_val
+            else:
+                result = str(a_val) + str(b_val)
+        elif op_symbol == '-':
+            try: result = a_val - b_val
+            except: result = str(a_val) + "-" + str(b_val) # Placeholder for non-numeric
+        elif op_symbol == '<<':
+            try: result = a_val << b_val
+            except: result = str(a_val) + "<<" + str(b_val)
+        elif op_symbol == '>>':
+            try: result = a_val >> b_val
+            except: result = str(a_val) + ">>" + str(b_val)
+        elif op_symbol == '>':
+            try: result = a_val > b_val
+            except TypeError: result = str(a_val) > str(b_val)
+        elif op_symbol == '<':
+            try: result = a_val < b_val
+            except TypeError: result = str(a_val) < str(b_val)
+        elif op_symbol == '==':
+            result = a_val == b_val
+        elif op_symbol == '!=':
+            result = not (a_val == b_val)
+        else: result = None
+        return result
+
+    # Op handlers: each takes the node and its consumed input values (empty unless the node
+    # has at least arity pending values) and returns (result Token or None, consumed count)
+    def _exec_noop(self, node, inputs):
+        return None, 0
+
+    def _exec_constant(self, node, inputs):
+        return Token(self.const_value[node], node), 0
+
+    def _exec_function_input(self, node, inputs):
+        return Token(self.arg_value[node], node), 0
+
+    def _exec_carry(self, node, inputs):
+        if len(inputs) == 1:
+            return Token(inputs[0], node), 1
+        if len(inputs) == 3:
+            condition, B = inputs[0], inputs[1]
+            return (Token(B, node) if condition else None), 3
+        return None, 0
+
+    def _exec_binop(self, node, inputs):
+        if len(inputs) != 2: return None, 0
+        a_val, b_val = inputs
+        op_symbol = self.op_symbol.get(node, '+')
+        if node in self.numeric_only:
+            # Operands are provably numeric: no bool coercion or TypeError fallback needed
+            result = NUMERIC_BINOPS[op_symbol](a_val, b_val)
+        else:
+            result = self.eval_binop(op_symbol, a_val, b_val)
+        return (Token(result, node) if result is not None else None), 2
+
+    def _exec_load(self, node, inputs):
+        if len(inputs) != 3: return None, 0
+        addr, offset_val, valid_bit = inputs
+        if not valid_bit: return None, 0
+        final_address = addr + offset_val if isinstance(addr, (int,float)) and isinstance(offset_val, (int,float)) else addr # Fallback if not numeric
+        value = memory.get(final_address)
+        return (Token(value, node) if value is not None else None), 3
+
+    def _exec_store(self, node, inputs):
+        if len(inputs) != 3: return None, 0
+        offset, addr, val_to_store = inputs
+        final_address = addr + offset if isinstance(addr, (int,float)) and isinstance(offset, (int,float)) else addr # Fallback
+        memory[final_address] = val_to_store
+        valid_bit_out = 1
+        return Token(valid_bit_out, node), 3
+
+    def _exec_ts(self, node, inputs):
+        if len(inputs) != 2: return None, 0
+        cond, val = inputs
+        return (Token(val, node) if cond else None), 2
+
+    def _exec_fs(self, node, inputs):
+        if len(inputs) != 2: return None, 0
+        cond, val = inputs
+        return (Token(val, node) if not cond else None), 2
+
+    def _exec_merge(self, node, inputs):
+        if len(inputs) != 3: return None, 0
+        decider, true_val, false_val = inputs
+        return Token(true_val if decider else false_val, node), 3
 
-        current_input_tokens = self.pending_tokens[node] 
-        result_token = None
-        consumed_count = 0
+    def execute_node(self, node):
+        op_type = self.op[node]
+        current_input_values = list(self.pending_tokens[node])
         consumed_input_values = []
 
-        arity = self.get_op_arity(node)
+        arity = self.arity[node]
         
-        if arity > 0 and len(current_input_tokens) >= arity:
-            consumed_input_values = [t.value for t in current_input_tokens]
+        if arity > 0 and len(current_input_values) >= arity:
+            consumed_input_values = current_input_values
 
-        if op_type == 'Constant':
-            value = self.G.nodes[node].get('value', 0)
-            result_token = Token(value, node)
-        
-        elif op_type == 'FunctionInput':
-            value = self.G.nodes[node].get('arg_value', 0)
-            result_token = Token(value, node)
-        
-        elif op_type == 'Carry':
-            if arity == 1 and len(consumed_input_values) >= 1:
-                if (len(consumed_input_values) == 1):
-                    A = consumed_input_values[0]
-                    consumed_count = 1
-                    result_token = Token(A, node)
-                elif (len(consumed_input_values) == 3):
-                    consumed_count = 3
-                    condition, B, A = consumed_input_values[0], consumed_input_values[1], consumed_input_values[2] 
-                    if (condition):
-                        result_token = Token(B, node)
-
-        elif op_type == 'BasicBinaryOp':
-            if arity == 2 and len(consumed_input_values) == 2:
-                a_val, b_val = consumed_input_values[0], consumed_input_values[1]
-                consumed_count = 2
-                op_symbol = self.G.nodes[node].get('op_symbol', '+')
-                op_symbol_for_log = op_symbol
-                
-                if isinstance(a_val, bool): a_val = int(a_val)
-                if isinstance(b_val, bool): b_val = int(b_val)
-
-                if op_symbol == '+':
-                    if isinstance(a_val, (int, float)) and isinstance(b_val, (int, float)):
-                        result = a_val + b_val
-                    else:
-                        result = str(a_val) + str(b_val)
-                elif op_symbol == '-':
-                    try: result = a_val - b_val
-                    except: result = str(a_val) + "-" + str(b_val) # Placeholder for non-numeric
-                elif op_symbol == '<<':
-                    try: result = a_val << b_val
-                    except: result = str(a_val) + "<<" + str(b_val)
-                elif op_symbol == '>>':
-                    try: result = a_val >> b_val
-                    except: result = str(a_val) + ">>" + str(b_val)
-                elif op_symbol == '>':
-                    try: result = a_val > b_val
-                    except TypeError: result = str(a_val) > str(b_val)
-                elif op_symbol == '<':
-                    try: result = a_val < b_val
-                    except TypeError: result = str(a_val) < str(b_val)
-                elif op_symbol == '==':
-                    result = a_val == b_val
-                elif op_symbol == '!=':
-                    result = not (a_val == b_val)
-                else: result = None
-                
-                if result is not None: result_token = Token(result, node)
-        
-        elif op_type == 'Load':
-            if arity == 3 and len(consumed_input_values) == 3:
-                addr, offset_val, valid_bit = consumed_input_values[0], consumed_input_values[1], consumed_input_values[2] 
-                if (valid_bit):
-                    consumed_count = 3
-                    final_address = addr + offset_val if isinstance(addr, (int,float)) and isinstance(offset_val, (int,float)) else addr # Fallback if not numeric
-                    value = memory.get(final_address)
-                    if value is not None: 
-                        result_token = Token(value, node)
-        
-        elif op_type == 'Store':
-            if arity == 3 and len(consumed_input_values) == 3:
-                addr, val_to_store, offset = consumed_input_values[1], consumed_input_values[2], consumed_input_values[0]
-                consumed_count = 3
-                final_address = addr + offset if isinstance(addr, (int,float)) and isinstance(offset, (int,float)) else addr # Fallback
-                memory[final_address] = val_to_store
-                valid_bit_out = 1
-                result_token = Token(valid_bit_out, node)
-        
-        elif op_type == 'TS': 
-            if arity == 2 and len(consumed_input_values) == 2:
-                cond, val = consumed_input_values[0], consumed_input_values[1]
-                consumed_count = 2
-                if cond: result_token = Token(val, node)
-        
-        elif op_type == 'FS':
-            if arity == 2 and len(consumed_input_values) == 2:
-                cond, val = consumed_input_values[0], consumed_input_values[1]
-                consumed_count = 2
-                if not cond: result_token = Token(val, node)
-        
-        elif op_type == 'Merge':
-            if arity == 3 and len(consumed_input_values) == 3:
-                decider, true_val, false_val = consumed_input_values[0], consumed_input_values[1], consumed_input_values[2]
-                consumed_count = 3
-                result = true_val if decider else false_val
-                result_token = Token(result, node)
+        result_token, consumed_count = self._handlers.get(op_type, self._exec_noop)(node, consumed_input_values)
+        # A binop that fired is logged by its symbol, defaulting to '+' like its evaluation
+        op_symbol_for_log = self.op_symbol.get(node, '+' if op_type == 'BasicBinaryOp' and consumed_count else op_type)
 
         if result_token:
             self.node_values[node] = result_token.value
             
+        values = self.pending_tokens[node]
+        sources = self.pending_sources[node]
         if consumed_count > 0: # Ensure only consumed tokens are removed
-            self.pending_tokens[node] = []
+            values.clear()
+            sources.clear()
         elif arity > 0 and consumed_count == 0 and op_type not in ['Constant', 'FunctionInput', 'Stream']:
             # This case implies an op had arity, but didn't logically consume inputs
             # (e.g. condition failed in TS/FS before consumption was set, or Load failed)
             # We still need to remove the tokens that were checked for arity
-            self.pending_tokens[node] = self.pending_tokens[node][arity:]
+            for _ in range(min(arity, len(values))):
+                values.popleft()
+                sources.popleft()
+        if len(values) < arity:
+            self.ready.discard(node)
 
 
         return {
             'node_id': node,
             'result_token': result_token,
-            'consumed_inputs': consumed_input_values if consumed_count > 0 else ([t.value for t in current_input_tokens[:arity]] if arity > 0 else []), # Log what was available if not consumed
+            'consumed_inputs': consumed_input_values if consumed_count > 0 else (current_input_values[:arity] if arity > 0 else []), # Log what was available if not consumed
             'op_label': op_symbol_for_log
         }
     
@@ -258,7 +397,8 @@ class TokenBasedExecutor:
         if self.completed:
             return None
         
-        executable_nodes = [node for node in self.G.nodes() if self.can_execute(node)]
+        # Nodes fire as one round in graph order; their outputs only arrive after the round
+        executable_nodes = sorted(self.ready, key=self.index.__getitem__)
         
         if not executable_nodes:
             stuck = any(self.pending_tokens[n] for n in self.pending_tokens)
@@ -276,57 +416,349 @@ class TokenBasedExecutor:
         }
         self.execution_sequence.append(step_info)
         
-        if not self.completed:
-            for detail in execution_details_for_step:
-                result_token = detail['result_token']
-                if result_token: # Check if a token was actually produced
-                    source_node = detail['node_id'] 
-                    for successor in self.G.successors(source_node):
-                        self.add_token(successor, Token(result_token.value, source_node))
+        if self.completed:
+            # Nothing fires after completion: release the tokens still in flight instead of propagating
+            for node in self.pending_tokens:
+                self.pending_tokens[node].clear()
+                self.pending_sources[node].clear()
+            self.ready.clear()
+            return step_info
+
+        for detail in execution_details_for_step:
+            result_token = detail['result_token']
+            if result_token: # Check if a token was actually produced
+                source_node = detail['node_id'] 
+                for successor in self.successors[source_node]:
+                    self.add_token(successor, result_token.value, source_node)
         
         return step_info
 
 
+# Load the raw node and edge data of a .dot file, through pygraphviz when available
+def read_dot_data(dot_path):
+    if pgv is not None:
+        A = pgv.AGraph(filename=dot_path)
+        nodes = [(str(n), dict(n.attr)) for n in A.nodes()]
+        edges = [(str(e[0]), str(e[1]), dict(e.attr)) for e in A.edges()]
+        return nodes, edges
+    if pydot is None:
+        raise ImportError("Reading .dot files requires pydot or pygraphviz (pip install pydot)")
+    graphs = pydot.graph_from_dot_file(dot_path)
+    if not graphs: raise ValueError("pydot could not parse the file")
+    # Walk the pydot tree directly instead of through networkx's MultiGraph conversion.
+    # Repeated node statements merge their attributes, as in networkx.
+    node_attrs, edges = {}, []
+    def walk(P):
+        for p in P.get_node_list():
+            n = p.get_name().strip('"')
+            if n in ('node', 'graph', 'edge'): continue # Default attribute statements
+            node_attrs.setdefault(n, {}).update(p.get_attributes())
+        for e in P.get_edge_list():
+            u, v = e.get_source(), e.get_destination()
+            if isinstance(u, str) and isinstance(v, str): # Edges to whole subgraphs are not supported
+                edges.append((u.strip('"'), v.strip('"'), dict(e.get_attributes())))
+        for sg in P.get_subgraph_list():
+            walk(sg)
+    walk(graphs[0])
+    return list(node_attrs.items()), edges
+
+# Mark BasicBinaryOps whose operands can only ever be numbers (numeric_only=True).
+# Constants are numeric, and so is a numeric-op result fed only by numeric producers.
+# FunctionInputs are not, since the user may type any string into them.
+def tag_numeric_binops(G):
+    numeric = {n for n, d in G.nodes(data=True) if d.get('op') == 'Constant'}
+    candidates = [n for n, d in G.nodes(data=True)
+                  if d.get('op') == 'BasicBinaryOp' and d.get('op_symbol') in NUMERIC_BINOPS]
+    changed = True
+    while changed:
+        changed = False
+        for n in candidates:
+            if n not in numeric and all(p in numeric for p in G.predecessors(n)):
+                numeric.add(n)
+                changed = True
+    for n in candidates:
+        G.nodes[n]['numeric_only'] = n in numeric
+
+def report_unknown_labels():
+    if UNKNOWN_LABELS:
+        print(f"Skipped {sum(UNKNOWN_LABELS.values())} unknown nodes, (label, shape): {UNKNOWN_LABELS.most_common()}")
+
 # Read and process the .dot file
 def read_graph(dot_path):
     try:
-        G_raw = nx.drawing.nx_pydot.read_dot(dot_path)
+        raw_nodes, raw_edges = read_dot_data(dot_path)
+        UNKNOWN_LABELS.clear()
         G = nx.DiGraph()
-        if not G_raw.nodes():
+        if not raw_nodes:
             return G
 
         # Only add nodes with recognized labels
-        for n, data in G_raw.nodes(data=True):
+        for n, data in raw_nodes:
             meta = infer_op_metadata(data)
-            if meta.get('op') == 'Unknown':
-                print(f"Skipping unknown node: {n}")
-                continue
+            if meta.get('op') == 'Unknown': continue
             G.add_node(n, **data, **meta)
 
         # Add edges only if both endpoints exist in the filtered node set
-        G.add_edges_from((u, v, d) for u, v, d in G_raw.edges(data=True) if u in G.nodes and v in G.nodes)
+        G.add_edges_from((u, v, d) for u, v, d in raw_edges if u in G.nodes and v in G.nodes)
+        report_unknown_labels()
 
+        tag_numeric_binops(G)
         return G
     except Exception as e:
         print(f"Error reading graph: {e}")
         messagebox.showerror("Graph Read Error", f"Could not read or parse .dot file: {dot_path}\n{e}\n")
         sys.exit()
 
-# Enhanced layout with dot option preferred
-def create_enhanced_layout(G, layout_type='dot'):
-    if not G.nodes(): return {}
+# Parsed graph memoized in a pickle in CACHE_DIR. The pickle holds read_graph()'s output,
+# so the key covers the file contents, the parser backend (pygraphviz and pydot quote
+# labels differently) and this module's source, which does the label and op inference.
+# The unknown-label summary is stored with the graph and reported again on a hit.
+def cached_graph(dot_path):
+    try:
+        with open(dot_path, 'rb') as f: contents = f.read()
+        with open(__file__, 'rb') as f: source = f.read()
+    except OSError:
+        return read_graph(dot_path) # Reports the unreadable file
+    backend = 'pygraphviz' if pgv is not None else 'pydot'
+    key = hashlib.blake2b(contents + f"|{backend}|".encode() + hashlib.blake2b(source).digest()).hexdigest()[:32]
+    cache_path = os.path.join(CACHE_DIR, f"graph-{key}.pkl")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f: G, unknown_labels = pickle.load(f)
+            UNKNOWN_LABELS.clear()
+            UNKNOWN_LABELS.update(unknown_labels)
+            report_unknown_labels()
+            return G
+        except Exception as e: print(f"Warning: Ignoring unreadable graph cache {cache_path}: {e}")
+    G = read_graph(dot_path)
     try:
-        if layout_type == 'dot': return nx.drawing.nx_pydot.graphviz_layout(G, prog='dot') 
-        elif layout_type == 'neato': return nx.drawing.nx_pydot.graphviz_layout(G, prog='neato')
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as f: pickle.dump((G, dict(UNKNOWN_LABELS)), f)
+    except OSError as e: print(f"Warning: Could not write graph cache {cache_path}: {e}")
+    return G
+
+# Run a Graphviz layout program, through pygraphviz when available
+def graphviz_layout(G, prog):
+    if pgv is None:
+        return nx.drawing.nx_pydot.graphviz_layout(G, prog=prog)
+    A = pgv.AGraph(directed=True)
+    A.add_nodes_from(G.nodes())
+    A.add_edges_from(G.edges())
+    A.layout(prog=prog)
+    return {n: tuple(map(float, A.get_node(n).attr['pos'].split(','))) for n in G.nodes()}
+
+# One ForceAtlas2-style iteration on SoA float64 positions: degree-weighted repulsion
+# between all pairs, linear attraction along edges and gravity towards the origin.
+# Every node moves at most temp. Compiled with numba (parallel over nodes) when installed.
+def _fa2_step(pos, edges_src, edges_dst, mass, temp):
+    n = pos.shape[0]
+    disp = np.zeros_like(pos)
+    for i in prange(n):
+        fx = 0.0
+        fy = 0.0
+        for j in range(n):
+            if i != j:
+                dx = pos[i, 0] - pos[j, 0]
+                dy = pos[i, 1] - pos[j, 1]
+                f = mass[i] * mass[j] / (dx * dx + dy * dy + 1e-9)
+                fx += dx * f
+                fy += dy * f
+        d = np.sqrt(pos[i, 0] * pos[i, 0] + pos[i, 1] * pos[i, 1]) + 1e-9
+        disp[i, 0] = fx - mass[i] * pos[i, 0] / d
+        disp[i, 1] = fy - mass[i] * pos[i, 1] / d
+    for e in range(edges_src.shape[0]): # Serial: several edges may touch the same node
+        u = edges_src[e]
+        v = edges_dst[e]
+        dx = pos[u, 0] - pos[v, 0]
+        dy = pos[u, 1] - pos[v, 1]
+        disp[u, 0] -= dx
+        disp[u, 1] -= dy
+        disp[v, 0] += dx
+        disp[v, 1] += dy
+    for i in prange(n):
+        length = np.sqrt(disp[i, 0] * disp[i, 0] + disp[i, 1] * disp[i, 1])
+        if length > temp:
+            disp[i, 0] *= temp / length
+            disp[i, 1] *= temp / length
+        pos[i, 0] += disp[i, 0]
+        pos[i, 1] += disp[i, 1]
+
+if njit is not None:
+    _fa2_step = njit(parallel=True, cache=True)(_fa2_step)
+
+# ForceAtlas2-style layout iterated with _fa2_step, cooling the step size each iteration
+def numba_fa2_layout(G, iterations=500, cooling=0.99, seed=None):
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    edges_src = np.array([index[u] for u, v in G.edges()], dtype=np.int64)
+    edges_dst = np.array([index[v] for u, v in G.edges()], dtype=np.int64)
+    mass = np.array([G.degree(node) + 1 for node in nodes], dtype=np.float64)
+    pos = (np.random.default_rng(seed).random((n, 2)) - 0.5) * np.sqrt(n) * mass.mean()
+    temp = np.sqrt(n) * mass.mean() / 10
+    for _ in range(iterations):
+        _fa2_step(pos, edges_src, edges_dst, mass, temp)
+        temp *= cooling
+    pos = nx.rescale_layout(pos)
+    return {node: tuple(xy) for node, xy in zip(nodes, pos)}
+
+# Dense Fruchterman-Reingold with the pairwise forces accumulated in one einsum per
+# iteration. Only needs numpy, unlike networkx's large-graph solver which needs scipy.
+def _fr(G, iterations=50, seed=None):
+    nodes = list(G.nodes())
+    n = len(nodes)
+    A = nx.to_numpy_array(G, nodelist=nodes, weight=None)
+    A = np.maximum(A, A.T)
+    k = np.sqrt(1.0 / n) # Optimal distance between nodes
+    pos = np.random.default_rng(seed).random((n, 2))
+    t = 0.1 # Temperature, cooled linearly to 0
+    dt = t / (iterations + 1)
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist = np.linalg.norm(delta, axis=-1)
+        np.clip(dist, 0.01, None, out=dist)
+        # Repulsion k^2/d between all pairs, attraction d^2/k along edges, both along delta/d
+        disp = np.einsum('ijd,ij->id', delta, k * k / dist ** 2 - A * dist / k)
+        length = np.linalg.norm(disp, axis=-1)
+        np.clip(length, 0.01, None, out=length)
+        pos += disp * (t / length)[:, None]
+        t -= dt
+    pos = nx.rescale_layout(pos)
+    return {node: tuple(xy) for node, xy in zip(nodes, pos)}
+
+# Fruchterman-Reingold or Kamada-Kawai layout computed by igraph. The graph stays a
+# networkx graph; igraph only sees vertex indices, mapped back to node ids afterwards.
+def igraph_layout(G, algorithm='fruchterman_reingold'):
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    g = igraph.Graph(n=len(nodes), edges=[(index[u], index[v]) for u, v in G.edges()], directed=G.is_directed())
+    if algorithm == 'kamada_kawai': coords = g.layout_kamada_kawai()
+    else: coords = g.layout_fruchterman_reingold(niter=500)
+    pos = nx.rescale_layout(np.asarray(coords.coords, dtype=float))
+    return {node: tuple(xy) for node, xy in zip(nodes, pos)}
+
+# Force-directed layout, picking the fastest implementation available for the graph size
+def spring_layout(G):
+    if igraph is not None: return igraph_layout(G)
+    if G.number_of_nodes() > LARGE_GRAPH_NODES:
+        if njit is not None: return numba_fa2_layout(G)
+        return _fr(G)
+    return nx.spring_layout(G, k=0.5/(G.number_of_nodes()**0.5) if G.number_of_nodes() > 0 else 0.5, iterations=100)
+
+# Name of the implementation that computes layout_type for G, part of the layout cache key
+def layout_backend(G, layout_type):
+    if layout_type in ('dot', 'neato'): return 'pygraphviz' if pgv is not None else 'pydot'
+    if layout_type in ('shell', 'spectral'): return 'networkx'
+    if layout_type == 'kamada_kawai': return 'igraph' if igraph is not None else 'networkx'
+    if igraph is not None: return 'igraph' # Everything else is a spring layout
+    if G.number_of_nodes() > LARGE_GRAPH_NODES: return 'numba' if njit is not None else 'numpy'
+    return 'networkx'
+
+# Enhanced layout with dot option preferred; also reports whether Graphviz failed and
+# the spring layout was used instead
+def layout_with_fallback(G, layout_type='dot'):
+    if not G.nodes(): return {}, False
+    try:
+        if layout_type == 'dot': return graphviz_layout(G, 'dot'), False
+        elif layout_type == 'neato': return graphviz_layout(G, 'neato'), False
     except Exception as e:
         messagebox.showwarning("Layout Error", f"Graphviz '{layout_type}' layout failed: {e}\nFalling back to spring layout.")
+        return spring_layout(G), True
     # Fallback layouts
-    if layout_type in ['spring', 'dot', 'neato']: # dot/neato fallback here
-        return nx.spring_layout(G, k=0.5/(G.number_of_nodes()**0.5) if G.number_of_nodes() > 0 else 0.5, iterations=100)
-    elif layout_type == 'shell': return nx.shell_layout(G, scale=2.0)
-    elif layout_type == 'spectral': return nx.spectral_layout(G, scale=2.0)
-    elif layout_type == 'kamada_kawai': return nx.kamada_kawai_layout(G, scale=1.0)
-    else: return nx.spring_layout(G, k=0.5/(G.number_of_nodes()**0.5) if G.number_of_nodes() > 0 else 0.5, iterations=100)
+    if layout_type == 'spring': return spring_layout(G), False
+    elif layout_type == 'shell': return nx.shell_layout(G, scale=2.0), False
+    elif layout_type == 'spectral': return nx.spectral_layout(G, scale=2.0), False
+    elif layout_type == 'kamada_kawai':
+        if igraph is not None: return igraph_layout(G, 'kamada_kawai'), False
+        return nx.kamada_kawai_layout(G, scale=1.0), False
+    else: return spring_layout(G), False
+
+def create_enhanced_layout(G, layout_type='dot'):
+    return layout_with_fallback(G, layout_type)[0]
+
+# Layout memoized in a pickle in CACHE_DIR, keyed by the graph structure, the algorithm and
+# its backend. A spring layout standing in for a failed Graphviz run is not cached.
+def cached_layout(G, layout_type):
+    backend = layout_backend(G, layout_type)
+    key = hashlib.blake2b(f"{layout_type}|{backend}|{sorted(map(str, G.nodes))}|{sorted(map(str, G.edges))}".encode()).hexdigest()[:32]
+    cache_path = os.path.join(CACHE_DIR, f"layout-{key}.pkl")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f: return pickle.load(f)
+        except Exception as e: print(f"Warning: Ignoring unreadable layout cache {cache_path}: {e}")
+    layout, fell_back = layout_with_fallback(G, layout_type)
+    if fell_back: return layout
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as f: pickle.dump(layout, f)
+    except OSError as e: print(f"Warning: Could not write layout cache {cache_path}: {e}")
+    return layout
+
+
+# Points along cubic Bezier curves, ctrl is (E, 4, 2) and t is (S,) or (E, S); returns (E, S, 2)
+def _bezier(ctrl, t):
+    t = np.atleast_2d(t)[..., None]
+    u = 1 - t
+    return (u**3 * ctrl[:, None, 0] + 3 * u**2 * t * ctrl[:, None, 1]
+            + 3 * u * t**2 * ctrl[:, None, 2] + t**3 * ctrl[:, None, 3])
+
+# Display-space polylines of arc3-curved '->' arrows between node centers p0 and p1 (both (E, 2)),
+# clipped at the node markers (radius px) and ending in an open arrowhead (head px long).
+# Self-loops are drawn as a loop above the node. Returns (E, samples + 3, 2) and a mask
+# of edges whose endpoints are far enough apart to draw.
+def arrow_polylines(p0, p1, radius, head, rad=0.1, samples=16):
+    d = p1 - p0
+    c = (p0 + p1) / 2 + rad * np.stack([d[:, 1], -d[:, 0]], axis=1) # Same control point as arc3
+    ctrl = np.stack([p0, p0 + 2 / 3 * (c - p0), p1 + 2 / 3 * (c - p1), p1], axis=1)
+    loop = (d == 0).all(axis=1)
+    if loop.any():
+        ctrl[loop, 1] = p0[loop] + [-2 * radius, 4 * radius]
+        ctrl[loop, 2] = p0[loop] + [2 * radius, 4 * radius]
+    # Clip to the first/last sampled point outside the markers, then resample between them
+    t = np.linspace(0, 1, 4 * samples)
+    pts = _bezier(ctrl, t)
+    out0 = np.linalg.norm(pts - p0[:, None], axis=2) >= radius
+    out1 = np.linalg.norm(pts - p1[:, None], axis=2) >= radius
+    valid = (out0 & out1).any(axis=1)
+    t0 = t[out0.argmax(axis=1)]
+    t1 = t[len(t) - 1 - out1[:, ::-1].argmax(axis=1)]
+    valid &= t1 > t0
+    s = np.linspace(0, 1, samples)
+    ts = t0[:, None] + (t1 - t0)[:, None] * s[None, :]
+    curve = _bezier(ctrl, ts)
+    tip = curve[:, -1]
+    direction = tip - curve[:, -2]
+    direction /= np.maximum(np.linalg.norm(direction, axis=1, keepdims=True), 1e-9)
+    normal = np.stack([-direction[:, 1], direction[:, 0]], axis=1)
+    # Barbs at the same angle as matplotlib's '->' style (head width/length = 0.2/0.4)
+    base = tip - direction * head * 2 / np.sqrt(5)
+    left, right = base + normal * head / np.sqrt(5), base - normal * head / np.sqrt(5)
+    return np.concatenate([curve, left[:, None], tip[:, None], right[:, None]], axis=1), valid
+
+# All edges of a graph as curved arrows in one LineCollection. Arrows are sized in points,
+# so the polylines are rebuilt in display space at each draw from the node positions;
+# set_edge_mask() picks which edges are drawn.
+class EdgeCollection(LineCollection):
+    def __init__(self, ax, pos, edge_idx, arrowsize=10, **kwargs):
+        super().__init__([], transform=IdentityTransform(), zorder=1, **kwargs)
+        self._ax = ax
+        self._pos = pos
+        self._edge_idx = edge_idx
+        self._arrowsize = arrowsize
+        self._mask = np.ones(len(edge_idx), dtype=bool)
+
+    def set_edge_mask(self, mask):
+        self._mask = mask
+        self.stale = True
+
+    def draw(self, renderer):
+        edges = self._edge_idx[self._mask]
+        xy = self._ax.transData.transform(self._pos)
+        radius = renderer.points_to_pixels(np.sqrt(NODE_SIZE) / 2)
+        head = renderer.points_to_pixels(0.4 * self._arrowsize)
+        lines, valid = arrow_polylines(xy[edges[:, 0]], xy[edges[:, 1]], radius, head)
+        self.set_segments(lines[valid])
+        super().draw(renderer)
 
 
 class DataflowSimulator:
@@ -338,15 +770,46 @@ class DataflowSimulator:
         
         self.G = G
         self.layout = layout
+        self._layout_checked = False  # self.layout was checked against G's nodes; G is not modified after that
         self.current_step = 0
         self.input_widgets = {}
+        self._reset_pending = None  # Tk after() id of a debounced reset, if one is scheduled
+        self._auto_timer = None  # Canvas timer stepping the simulation while it runs on its own
+        self._log_scroll_pending = False  # A scroll of the log to its end is queued for idle time
+        self._step_thread = None  # Worker thread running executor.step(), while a step is in flight
+        self._step_results = queue.Queue()  # (executor, step_info, exception or None) handed from the worker to Tk
+        self._sim_lock = threading.Lock()  # Held while the executor or memory is mutated
+        # Plot artists, built once per layout by build_artists(). Edges are static and
+        # live in the blitting background; the rest is animated and blitted per step.
+        self._node_idx = {}  # Row of each node in _pos
+        self._pos = np.empty((0, 2))  # (N, 2) node positions in G.nodes() order
+        self._edge_idx = np.empty((0, 2), dtype=np.intp)  # (E, 2) endpoint rows of each edge in G.edges() order
+        self._idle_state = np.empty(0, dtype=np.intp)  # State code of each node before it executes
+        self._out_edge_rows = {}  # Rows in _edge_idx of the out-edges of each node
+        self._executed_ever = np.zeros(0, dtype=bool)  # Nodes that have executed in any step so far
+        self._executed_steps_seen = 0  # Steps of the execution sequence already folded into _executed_ever
+        self.label_artists = {}  # Persistent Text artist of each node label
+        self.dirty_labels = set(self.G.nodes())  # Nodes whose label text is out of date
+        self.node_collection = None  # PathCollection of all nodes
+        self.edge_collection = None  # EdgeCollection of all edges, part of the background
+        self.active_edge_collection = None  # Red overlay EdgeCollection of the edges carrying a token
+        self.memory_text = None  # Memory contents box
+        self.background = None  # Saved canvas region without the animated artists
+        self._redraw_pending = False  # A full draw_idle() redraw is queued and has not run yet
+        self._memory_cache_str = "{}"  # Formatted memory contents shown in memory_text
+        self._memory_dirty = True  # Memory was written since _memory_cache_str was built
+        self._memory_key_str = {}  # str() of each memory address, kept across value writes
+        self._memory_keys = []  # Memory addresses in sorted order, extended as addresses appear; cleared with memory
         
         self.input_values = {}
-        for node_id in self.G.nodes():
-            if self.G.nodes[node_id].get('op') == 'FunctionInput':
-                self.input_values[node_id] = self.G.nodes[node_id].get('arg_value', 0)
+        self.param_name = {}  # Display name of each FunctionInput, as given in the .dot file
+        for node_id, data in self.G.nodes(data=True):
+            if data.get('op') == 'FunctionInput':
+                self.input_values[node_id] = data.get('arg_value', 0)
+                self.param_name[node_id] = data.get('param_name', '').strip('"')
         
-        self.executor = TokenBasedExecutor(self.G.copy())
+        self.executor = TokenBasedExecutor(self.G, input_values=self.input_values)
+        self.build_label_templates()
         
         self.create_widgets()
         self.reset_simulation()
@@ -377,13 +840,11 @@ class DataflowSimulator:
         input_canvas.create_window((0, 0), window=scrollable_input_frame, anchor="nw")
         input_canvas.configure(yscrollcommand=input_scrollbar.set)
         
-        input_nodes_data = [(nid, nd) for nid, nd in self.G.nodes(data=True) if nd.get('op') == 'FunctionInput']
-        if input_nodes_data:
-            for i, (node_id, node_data) in enumerate(sorted(input_nodes_data)):
+        if self.param_name:
+            for node_id in sorted(self.param_name):
                 row_frame = tk.Frame(scrollable_input_frame, bg='#e0e0e0')
                 row_frame.pack(fill='x', padx=5, pady=(2,3))
-                param_name = node_data.get('param_name', f'Node {node_id}').strip('"')
-                tk.Label(row_frame, text=f"{param_name}:", font=("Arial", 10), bg='#e0e0e0', width=15, anchor='e').pack(side='left')
+                tk.Label(row_frame, text=f"{self.param_name[node_id] or f'Node {node_id}'}:", font=("Arial", 10), bg='#e0e0e0', width=15, anchor='e').pack(side='left')
                 var = tk.StringVar(value=str(self.input_values.get(node_id, 0)))
                 entry = tk.Entry(row_frame, textvariable=var, font=("Arial", 10), width=10)
                 entry.pack(side='left', padx=(5, 0))
@@ -421,6 +882,8 @@ class DataflowSimulator:
         center_frame.pack(expand=True, pady=10)
         self.step_button = tk.Button(center_frame, text="Next Step", command=self.next_step, font=("Arial", 12, "bold"), bg='#4CAF50', fg='white', padx=20, pady=8, relief='raised', bd=3, width=12)
         self.step_button.pack(pady=(5, 8))
+        self.run_button = tk.Button(center_frame, text="Run", command=self.toggle_auto_run, font=("Arial", 10), bg='#2196F3', fg='white', padx=15, pady=5, relief='raised', bd=2, width=12)
+        self.run_button.pack(pady=8)
         self.reset_button = tk.Button(center_frame, text="Reset", command=self.reset_simulation, font=("Arial", 10), bg='#f44336', fg='white', padx=15, pady=5, relief='raised', bd=2, width=12)
         self.reset_button.pack(pady=8)
 
@@ -446,9 +909,13 @@ class DataflowSimulator:
         
         self.fig, self.ax = plt.subplots(figsize=(16, 10)) 
         self.fig.subplots_adjust(left=0.0, bottom=0.0, right=1.0, top=1.0)
+        # Memory box is created once with its bbox patch; build_artists() re-attaches it after ax.clear()
+        self.memory_text = self.ax.text(0.01, 0.98, "", transform=self.ax.transAxes, fontsize=9, verticalalignment='top', bbox=dict(boxstyle="round,pad=0.3", facecolor="khaki", alpha=0.7))
+        self.memory_text.set_animated(True)
 
         self.fig.patch.set_facecolor('white')
         self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
+        self.canvas.mpl_connect('draw_event', self.on_draw) # Full redraws (resize, pan/zoom) refresh the background
 
         # Add a toolbar for navigation (pan, zoom)
         self.toolbar = NavigationToolbar2Tk(self.canvas, graph_frame) # Master is 'self' (the main Tkinter window)
@@ -481,14 +948,12 @@ class DataflowSimulator:
                 try: value = float(val_str)
                 except ValueError: value = val_str # Fallback to string
             
-            memory[address] = value
+            with self._sim_lock: memory[address] = value
+            self._memory_dirty = True
             
             # Log the manual memory write
-            self.log_text_area.config(state='normal')
             log_line = f"--- Manual Memory Write ---\nAddress: {address}\tValue: {value}\n"
-            self.log_text_area.insert(tk.END, log_line)
-            self.log_text_area.see(tk.END)
-            self.log_text_area.config(state='disabled')
+            self.append_log(log_line)
             
             # Clear entries for next input
             self.mem_addr_entry.delete(0, tk.END)
@@ -508,24 +973,42 @@ class DataflowSimulator:
                 except ValueError: value = val_str 
         except ValueError: value = 0 
         
+        old_value = self.input_values.get(node_id)
+        if type(old_value) is type(value) and old_value == value:
+            return # e.g. "5" -> "5 " or "07" -> "7": nothing to reset
         self.input_values[node_id] = value
         if node_id in self.G.nodes:
              self.G.nodes[node_id]['arg_value'] = value
+
+        # Debounce: only reset once typing has paused for RESET_DEBOUNCE_MS
+        if self._reset_pending is not None:
+            self.root.after_cancel(self._reset_pending)
+        self._reset_pending = self.root.after(RESET_DEBOUNCE_MS, self._do_reset)
+
+    def _do_reset(self):
+        self._reset_pending = None
         self.reset_simulation()
 
     def reset_simulation(self):
         global memory
-        memory.clear()
+        if self._reset_pending is not None: # An explicit reset supersedes a debounced one
+            self.root.after_cancel(self._reset_pending)
+            self._reset_pending = None
         self.current_step = 0
         
-        current_G_copy = self.G.copy()
-        for node_id, value in self.input_values.items():
-            if node_id in current_G_copy.nodes and current_G_copy.nodes[node_id].get('op') == 'FunctionInput':
-                current_G_copy.nodes[node_id]['arg_value'] = value
-        
-        self.executor = TokenBasedExecutor(current_G_copy)
+        with self._sim_lock: # Waits out a step in flight; its result is then dropped as stale
+            memory.clear()
+            self.executor = TokenBasedExecutor(self.G, input_values=self.input_values)
+        self._memory_dirty = True
+        self._memory_key_str.clear()
+        self._memory_keys.clear()
+        self._executed_ever[:] = False
+        self._executed_steps_seen = 0
+        self.dirty_labels.update(self.G.nodes())
         
+        self.stop_auto_run()
         self.step_button.config(text="Next Step", state='normal', bg='#4CAF50')
+        self.run_button.config(state='normal')
 
         # Clear and update logger
         self.log_text_area.config(state='normal')
@@ -535,19 +1018,43 @@ class DataflowSimulator:
         
         self.update_plot()
 
+    # Steps run on a worker thread so an expensive step does not freeze the window;
+    # Tk polls for the result and applies it to the log and plot on the main thread.
     def next_step(self):
-        if self.executor.completed:
+        if self.executor.completed or self._step_thread is not None:
             return
 
-        step_info = self.executor.step()
+        executor = self.executor
+        def run_step():
+            with self._sim_lock:
+                step_info, error = None, None
+                try: step_info = executor.step()
+                except BaseException as e: error = e # Always answer _poll_step, or stepping stays blocked
+                self._step_results.put((executor, step_info, error))
+        self._step_thread = threading.Thread(target=run_step, daemon=True)
+        self._step_thread.start()
+        self.root.after(STEP_POLL_MS, self._poll_step)
+
+    def _poll_step(self):
+        try: executor, step_info, error = self._step_results.get_nowait()
+        except queue.Empty:
+            self.root.after(STEP_POLL_MS, self._poll_step)
+            return
+        self._step_thread = None
+        if error is not None:
+            self.stop_auto_run()
+            raise error # Reported by Tk like any other callback error; the GUI stays usable
+        if executor is self.executor: # Otherwise the simulation was reset while the step ran
+            self.apply_step(step_info)
+
+    def apply_step(self, step_info):
         log_entry_header_written = False
 
         if step_info and step_info.get('execution_details'):
             self.current_step += 1
             
-            self.log_text_area.config(state='normal')
             log_header = f"--- Step {self.current_step} ---\n"
-            self.log_text_area.insert(tk.END, log_header)
+            log_chunk = [log_header]
             log_entry_header_written = True
 
             executed_node_ids_this_step = []
@@ -565,28 +1072,34 @@ class DataflowSimulator:
                     else: output_val_str = str(val)
                 
                 log_line = f"Node{node_id}:\t{op_label},\tIn:[{inputs_str}],\tOut:{output_val_str}\n"
-                self.log_text_area.insert(tk.END, log_line)
+                log_chunk.append(log_line)
 
                 executed_node_ids_this_step.append(node_id)
                 if detail['result_token']:
                     result_values_this_step.append(detail['result_token'].value)
+                    self.dirty_labels.add(node_id) # Only nodes that produced a value change label
+                    if self.executor.op[node_id] == 'Store':
+                        self._memory_dirty = True
                         
             if self.executor.completed:
                 ret_val_str = f"{self.executor.return_value:.2f}" if isinstance(self.executor.return_value, float) else str(self.executor.return_value)
                 self.step_button.config(text=f"Done! Ret: {ret_val_str}", state='disabled', bg='#007ACC')
-                self.log_text_area.insert(tk.END, f"--- Simulation Completed. Return Value: {ret_val_str} ---\n")
+                self.stop_auto_run()
+                self.run_button.config(state='disabled')
+                log_chunk.append(f"--- Simulation Completed. Return Value: {ret_val_str} ---\n")
             
-            self.log_text_area.see(tk.END)
-            self.log_text_area.config(state='disabled')
+            self.append_log(''.join(log_chunk))
             self.update_plot()
 
         else: # No step_info or no execution_details means no node could execute
             self.step_button.config(text="No Progress", state='disabled', bg='#FFA500')
+            self.stop_auto_run()
+            self.run_button.config(state='disabled') # Run would only log another failed attempt
             pending_tokens_exist = any(self.executor.pending_tokens[n] for n in self.executor.pending_tokens if self.executor.pending_tokens[n])
             
-            self.log_text_area.config(state='normal')
+            log_chunk = []
             if not log_entry_header_written: # In case current_step wasn't incremented
-                 self.log_text_area.insert(tk.END, f"--- Step {self.current_step + 1} (Attempt) ---\n")
+                 log_chunk.append(f"--- Step {self.current_step + 1} (Attempt) ---\n")
 
             stuck_msg_status = f"Step: {self.current_step}. Stuck. "
             log_msg_details = "No node could execute.\n"
@@ -597,109 +1110,212 @@ class DataflowSimulator:
                 stuck_msg_status += "No executable nodes."
                 log_msg_details += "Graph may be stuck. No executable nodes and not completed.\n"
             
-            self.log_text_area.insert(tk.END, log_msg_details) # Changed from log_msg to log_msg_details for clarity
-            self.log_text_area.see(tk.END)
-            self.log_text_area.config(state='disabled')
+            log_chunk.append(log_msg_details) # Changed from log_msg to log_msg_details for clarity
+            self.append_log(''.join(log_chunk))
 
+    # One insert per call, trimming the oldest lines past LOG_MAX_LINES. Scrolling to the end
+    # is deferred to idle time so back-to-back steps scroll once.
+    def append_log(self, text):
+        self.log_text_area.config(state='normal')
+        self.log_text_area.insert(tk.END, text)
+        line_count = int(self.log_text_area.index('end-1c').split('.')[0])
+        if line_count > LOG_MAX_LINES:
+            self.log_text_area.delete('1.0', f"{line_count - LOG_MAX_LINES + 1}.0")
+        self.log_text_area.config(state='disabled')
+        if not self._log_scroll_pending:
+            self._log_scroll_pending = True
+            self.root.after_idle(self._scroll_log)
+
+    def _scroll_log(self):
+        self._log_scroll_pending = False
+        self.log_text_area.see(tk.END)
+
+    # The first label line only depends on the node, so each node gets bound str.format
+    # templates with just the value slot left: one for a computed value, one before it has run
+    def build_label_templates(self):
+        self._value_label = {}
+        self._idle_label = {}
+        self._value_label_cache = {}  # (value, label text) last formatted for each node
+        for n in self.G.nodes():
+            base_label = self.base_label(n).replace('{', '{{').replace('}', '}}')
+            self._value_label[n] = (base_label + "\n= {}").format
+            if self.executor.op[n] in ('FunctionInput', 'Constant'):
+                self._idle_label[n] = (base_label + "\n({})").format
+            else:
+                self._idle_label[n] = base_label.format # Ignores its argument
 
-    def update_plot(self):
+    # Auto-run steps on the canvas timer that FuncAnimation would use, but renders through
+    # our own blit(): FuncAnimation's blit cache would capture the blitted foreground.
+    def toggle_auto_run(self):
+        if self._auto_timer is not None:
+            self.stop_auto_run()
+            return
+        if self.executor.completed: return
+        self._auto_timer = self.canvas.new_timer(interval=AUTO_STEP_MS)
+        self._auto_timer.add_callback(self.next_step) # No-op while the previous step is in flight
+        self._auto_timer.start()
+        self.run_button.config(text="Pause")
+
+    def stop_auto_run(self):
+        if self._auto_timer is None: return
+        self._auto_timer.stop()
+        self._auto_timer = None
+        self.run_button.config(text="Run")
+
+    def format_label(self, n):
+        executor, node_values = self.executor, self.executor.node_values
+        if n in node_values:
+            val = node_values[n]
+            cached = self._value_label_cache.get(n)
+            if cached is not None and type(cached[0]) is type(val) and cached[0] == val:
+                return cached[1] # e.g. a source node re-firing with the same value
+            fmt = LABEL_VALUE_FORMAT.get(type(val))
+            if fmt is None: fmt = '{:.2f}'.format if isinstance(val, float) else str # e.g. float subclasses
+            label = self._value_label[n](fmt(val))
+            self._value_label_cache[n] = (val, label)
+            return label
+        op_type = executor.op[n]
+        if op_type == 'FunctionInput': return self._idle_label[n](executor.arg_value[n])
+        if op_type == 'Constant': return self._idle_label[n](executor.const_value[n])
+        return self._idle_label[n](None)
+
+    def base_label(self, n):
+        op_type = self.executor.op[n]
+        if op_type == 'FunctionInput':
+            return self.param_name[n] or f'In_{n}'
+        if op_type == 'BasicBinaryOp': return self.executor.op_symbol.get(n, '?')
+        return _BASE_LABEL.get(op_type, op_type)
+
+    def build_artists(self):
         self.ax.clear()
-        if not self.G.nodes():
-            self.ax.text(0.5, 0.5, 'Graph is empty.', ha='center', va='center', transform=self.ax.transAxes)
-            self.canvas.draw()
+        self.ax.axis('off') # ax.clear() turns the axis back on, so this is redone only per rebuild
+        self.background = None
+        edges = list(self.G.edges())
+        nodes = list(self.G.nodes())
+        self._node_idx = {n: i for i, n in enumerate(nodes)}
+        self._pos = np.array([self.layout[n] for n in nodes], dtype=np.float64)
+        self._edge_idx = np.array([(self._node_idx[u], self._node_idx[v]) for u, v in edges], dtype=np.intp).reshape(-1, 2)
+        lo, hi = self._pos.min(axis=0), self._pos.max(axis=0)
+        self.ax.update_datalim([lo - 0.05 * (hi - lo), hi + 0.05 * (hi - lo)]) # Padding for the curved edges
+        self.edge_collection = EdgeCollection(self.ax, self._pos, self._edge_idx, colors='black', linewidths=1.5, alpha=0.8)
+        self.active_edge_collection = EdgeCollection(self.ax, self._pos, self._edge_idx, colors='red', linewidths=1.5, alpha=1.0)
+        self.active_edge_collection.set_edge_mask(np.zeros(len(edges), dtype=bool))
+        self.ax.add_collection(self.edge_collection, autolim=False)
+        self.ax.add_collection(self.active_edge_collection, autolim=False)
+        self._idle_state = np.array([IDLE_STATE_OF_OP.get(self.executor.op[n], IDLE_STATE_OTHER) for n in nodes], dtype=np.intp)
+        out_rows = {n: [] for n in nodes}
+        for row, (u, v) in enumerate(edges): out_rows[u].append(row)
+        self._out_edge_rows = {n: np.array(rows, dtype=np.intp) for n, rows in out_rows.items()}
+        self._executed_ever = np.zeros(len(nodes), dtype=bool)
+        self._executed_steps_seen = 0
+        self.node_collection = self.ax.scatter(self._pos[:, 0], self._pos[:, 1], s=NODE_SIZE, marker='o', edgecolors='black', zorder=2)
+        self.label_artists = {}
+        for n, (x, y) in zip(nodes, self._pos):
+            self.label_artists[n] = self.ax.text(x, y, "", fontsize=8, fontweight='normal', ha='center', va='center', clip_on=True)
+        self.dirty_labels.update(self.G.nodes())
+        self.ax.add_artist(self.memory_text)
+        # The layout is fixed between steps, so settle the view limits once and stop autoscaling
+        self.ax.autoscale_view()
+        self.ax.set_autoscale_on(False)
+
+        self.active_edge_collection.set_animated(True)
+        self.node_collection.set_animated(True)
+        for text in self.label_artists.values(): text.set_animated(True)
+
+    def draw_animated(self, renderer):
+        self.active_edge_collection.draw(renderer)
+        self.node_collection.draw(renderer)
+        for text in self.label_artists.values(): text.draw(renderer)
+        self.memory_text.draw(renderer)
+
+    def on_draw(self, event):
+        # Saving draws the animated artists itself (possibly on another canvas such as SVG),
+        # and that frame must not become the blitting background
+        if self.canvas.is_saving() or event.canvas is not self.canvas:
             return
+        self._redraw_pending = False
+        if self.node_collection is None:
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_animated(event.renderer)
 
-        if not self.layout or set(self.layout.keys()) != set(self.G.nodes()):
-            self.layout = create_enhanced_layout(self.G, 'dot') 
-            if not self.layout and self.G.nodes(): self.layout = create_enhanced_layout(self.G, 'spring')
+    def blit(self):
+        if self.background is None: # Needs a full draw first, on_draw then captures the background
+            self.request_redraw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated(self.canvas.get_renderer())
+        self.canvas.blit(self.ax.bbox)
+
+    def request_redraw(self):
+        # Coalesce: at most one full redraw is queued at a time
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.canvas.draw_idle()
+
+    def clear_artists(self):
+        self.ax.clear()
+        self.label_artists = {}
+        self.edge_collection, self.active_edge_collection = None, None
+        self.node_collection, self.background = None, None
+
+    def update_plot(self):
+        if not self._layout_checked:
+            if not self.layout or set(self.layout.keys()) != set(self.G.nodes()):
+                self.layout = create_enhanced_layout(self.G, 'dot') 
+                if not self.layout and self.G.nodes(): self.layout = create_enhanced_layout(self.G, 'spring')
+                self.node_collection = None # Artists are positioned from the layout, so they have to be rebuilt
+            self._layout_checked = bool(self.layout)
         if not self.layout and self.G.nodes():
+            self.clear_artists()
             self.ax.text(0.5, 0.5, 'Layout failed.', ha='center', va='center', transform=self.ax.transAxes)
-            self.canvas.draw(); return
+            self.request_redraw(); return
+        if self.node_collection is None:
+            self.build_artists()
+
+        node_idx = self._node_idx
+        sequence = self.executor.execution_sequence
+        # Only steps taken since the last update are folded into the executed-ever mask
+        for step_log in sequence[self._executed_steps_seen:]:
+            self._executed_ever[[node_idx[d['node_id']] for d in step_log['execution_details']]] = True
+        self._executed_steps_seen = len(sequence)
+        last_step_details = sequence[-1]['execution_details'] if sequence else []
+
+        state = self._idle_state.copy()
+        state[self._executed_ever] = STATE_COMPLETED if self.executor.completed else STATE_EXECUTED
+        state[[node_idx[d['node_id']] for d in last_step_details]] = STATE_LAST_STEP
+
+        active_edges = np.zeros(len(self._edge_idx), dtype=bool) # Out-edges of the nodes that just produced a value
+        if not self.executor.completed:
+            for detail in last_step_details:
+                if detail['result_token']:
+                    active_edges[self._out_edge_rows[detail['node_id']]] = True
 
-        last_step_executed_node_ids = []
-        if self.executor.execution_sequence:
-            last_step_details = self.executor.execution_sequence[-1]['execution_details']
-            last_step_executed_node_ids = [d['node_id'] for d in last_step_details]
+        self.active_edge_collection.set_edge_mask(active_edges)
+        self.node_collection.set_facecolors(NODE_PALETTE[state])
+        self.node_collection.set_sizes(NODE_STATE_SIZES[state])
 
-        all_executed_node_ids_ever = set()
-        for step_log in self.executor.execution_sequence:
-            for detail in step_log['execution_details']:
-                all_executed_node_ids_ever.add(detail['node_id'])
-        
-        node_colors, node_sizes = [], []
-        active_edges = []
-
-        if self.executor.execution_sequence: 
-            last_step_details = self.executor.execution_sequence[-1]['execution_details']
-
-            if not self.executor.completed:
-                for detail in last_step_details:
-                    if detail['result_token']: 
-                        source_node = detail['node_id']
-                        for successor in self.executor.G.successors(source_node):
-                            active_edges.append((source_node, successor))
-        
-        for n in self.G.nodes():
-            op_type = self.G.nodes[n].get('op', 'Unknown')
-            if n in last_step_executed_node_ids:
-                node_colors.append('orange'); node_sizes.append(800)
-            elif n in all_executed_node_ids_ever:
-                node_colors.append('lightgreen' if not (self.executor.completed) else 'gold')
-                node_sizes.append(1200)
-            else:
-                if op_type == 'Stream': node_colors.append('salmon')
-                elif op_type == 'FunctionInput': node_colors.append('lightblue')
-                elif op_type == 'Constant': node_colors.append('lightsteelblue')
-                elif op_type == 'Return': node_colors.append('wheat')
-                else: node_colors.append('lightgray')
-                node_sizes.append(1100)
-
-        all_edges = list(self.G.edges())
-        inactive_edges = [e for e in all_edges if e not in active_edges]
-        nx.draw_networkx_edges(self.G, self.layout, ax=self.ax, edgelist=inactive_edges, arrowstyle='->', node_size=node_sizes, arrowsize=10, edge_color='black', width=1.5, alpha=0.8, connectionstyle='arc3,rad=0.1')
-        if active_edges:
-            nx.draw_networkx_edges(self.G, self.layout, ax=self.ax, edgelist=active_edges, arrowstyle='->', node_size=node_sizes, arrowsize=10, edge_color='red', width=1.5, alpha=1.0, connectionstyle='arc3,rad=0.1')
-        
-        nx.draw_networkx_nodes(self.G, self.layout, node_color=node_colors, node_size=node_sizes, ax=self.ax, edgecolors='black')
-        
-        labels = {}
-        for n in self.G.nodes():
-            node_data_g = self.G.nodes[n]
-            op_type = node_data_g.get('op', 'Unknown')
-            param_name = node_data_g.get('param_name', '').strip('"')
-            current_value_str = ""
-            if n in self.executor.node_values:
-                 val = self.executor.node_values[n]
-                 if isinstance(val, float): current_value_str = f"{val:.2f}"
-                 elif isinstance(val, bool): current_value_str = str(val)
-                 else: current_value_str = str(val)
-                 current_value_str = f"\n= {current_value_str}"
-            elif op_type == 'FunctionInput': current_value_str = f"\n({node_data_g.get('arg_value',0)})"
-            elif op_type == 'Constant': current_value_str = f"\n({node_data_g.get('value',0)})"
-
-            base_label = ""
-            if op_type == 'FunctionInput': base_label = param_name if param_name else f'In_{n}'
-            elif op_type == 'Constant': base_label = "Const"
-            elif op_type == 'Stream': base_label = "STR"
-            elif op_type == 'Return': base_label = "ret"
-            elif op_type == 'BasicBinaryOp': base_label = node_data_g.get('op_symbol', '?')
-            elif op_type == 'TS': base_label = "TS" 
-            elif op_type == 'FS': base_label = "FS" 
-            elif op_type == 'Load': base_label = "ld"
-            elif op_type == 'Store': base_label = "st"
-            elif op_type == 'Merge': base_label = "M"
-            elif op_type == 'Carry': base_label = "C"
-
-            else: base_label = op_type
-            labels[n] = f"{base_label}{current_value_str}"
-        
-        nx.draw_networkx_labels(self.G, self.layout, labels, font_size=8, ax=self.ax, font_weight='normal', verticalalignment='center')
-        
-        memory_str = ", ".join([f"{k}:{v}" for k,v in sorted(memory.items())]) if memory else "{}"
-        self.ax.text(0.01, 0.98, f"Memory: {memory_str}", transform=self.ax.transAxes, fontsize=9, verticalalignment='top', bbox=dict(boxstyle="round,pad=0.3", facecolor="khaki", alpha=0.7))
+        label_artists, format_label = self.label_artists, self.format_label
+        for n in self.dirty_labels:
+            label_artists[n].set_text(format_label(n))
+        self.dirty_labels.clear()
         
-        self.ax.axis('off')
-        self.canvas.draw_idle()
+        if self._memory_dirty: # Only re-format memory after a write
+            key_str, keys = self._memory_key_str, self._memory_keys
+            if len(keys) < len(memory): # Addresses are only removed by reset, so only new ones are inserted
+                for k in memory:
+                    if k not in key_str:
+                        bisect.insort(keys, k)
+                        key_str[k] = str(k)
+            parts = []
+            for k in keys:
+                v = memory[k]
+                parts.append(key_str[k] + ':' + (int.__repr__(v) if type(v) is int else format(v)))
+            self._memory_cache_str = ", ".join(parts) if parts else "{}"
+            self._memory_dirty = False
+            self.memory_text.set_text(f"Memory: {self._memory_cache_str}")
+
+        self.blit()
 
 def main():
     parser = argparse.ArgumentParser(description="Token-Based Dataflow Graph Simulator")
@@ -708,25 +1324,28 @@ def main():
     parser.add_argument('--inputs', type=str, help='JSON string of initial input values (e.g., \'{"node_id1": 10}\')') # Added from previous context
     args = parser.parse_args()
 
-    G = read_graph(args.dot)
+    G = cached_graph(args.dot)
     if args.inputs: # Added from previous context
         try:
-            cmd_input_values = json.loads(args.inputs)
-            for node_id, value in cmd_input_values.items():
-                if node_id in G.nodes and G.nodes[node_id].get('op') == 'FunctionInput':
-                    G.nodes[node_id]['arg_value'] = value
-        except json.JSONDecodeError: print(f"Error: Invalid JSON for --inputs: {args.inputs}")
+            cmd_input_values = orjson.loads(args.inputs) if orjson is not None else json.loads(args.inputs)
+            function_inputs = {n for n, d in G.nodes(data=True) if d.get('op') == 'FunctionInput'}
+            for node_id in function_inputs & cmd_input_values.keys():
+                G.nodes[node_id]['arg_value'] = cmd_input_values[node_id]
+        except json.JSONDecodeError: print(f"Error: Invalid JSON for --inputs: {args.inputs}") # Also catches orjson's subclass
         except Exception as e: print(f"Error processing --inputs: {e}")
 
 
-    layout = {}
-    if G.nodes(): layout = create_enhanced_layout(G, args.layout)
-    else: print("Warning: Graph is empty.")
+    if not G.nodes():
+        print("Warning: Graph is empty.")
+        return
+    layout = cached_layout(G, args.layout)
 
     def on_close():
+        app.stop_auto_run()
+        app.fig.clf()
+        plt.close(app.fig) # Only our figure, no scan of pyplot's figure registry
+        root.quit()        # mainloop() returns and main() ends normally
         root.destroy()
-        plt.close('all')  # Close all matplotlib figures
-        sys.exit(0)       # Ensure the script terminates
 
     root = tk.Tk()
     root.protocol("WM_DELETE_WINDOW", on_close)  # Handle the X button